@@ -3,6 +3,8 @@ The :mod:`~costa.defaults` module provide default correction functions
 used to obtain missing values in a performance map.
 """
 
+from functools import lru_cache
+
 import numpy as np
 
 
@@ -25,11 +27,13 @@ def compexp(x, amp, scale, shape, lift, shift):
     return (amp - lift) * np.exp(-(shifted / scale) ** shape) + lift
 
 
+@lru_cache
 def default_correction(mode, pminput, pmoutput=None):
     """Return performance map output correction.
 
     Get a callable correction of a given output quantity depending on a
-    certain input quantity in a specific operating mode.
+    certain input quantity in a specific operating mode.  Corrections are
+    cached, so the same function is returned for the same arguments.
 
     Parameters
     ----------
@@ -46,6 +50,8 @@ def default_correction(mode, pminput, pmoutput=None):
     -------
     correction : callable
         Correction for the specified quantities in the given mode.
+        It behaves like a NumPy ufunc: arrays are corrected element-wise
+        and the output has the same shape as the input.
 
     Examples
     --------
@@ -95,11 +101,11 @@ def default_correction(mode, pminput, pmoutput=None):
         return lambda x: function(x, *parameters)
     elif pminput == 'AFR':
         # Placeholder (no correction for now)
-        def correction_afr(AFR): return 1
+        def correction_afr(AFR): return np.ones_like(AFR, dtype=float)
         return correction_afr
     elif pminput == 'Twbr':
         # Placeholder (no correction for now)
-        def correction_wetbulb(Twbr): return 1
+        def correction_wetbulb(Twbr): return np.ones_like(Twbr, dtype=float)
         return correction_wetbulb
     elif pminput.lower() == 'shr':
         if mode == 'heating':
@@ -125,7 +131,8 @@ def build_default_corrections(mode):
     Returns
     -------
     default_corrections : dict
-        Corrections for the specified mode.
+        Corrections for the specified mode.  A new dict is built on each
+        call, but the correction functions themselves are shared.
 
     """
     default_corrections = {
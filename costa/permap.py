@@ -3,6 +3,10 @@ The ``permap`` module provides the Permap class, an extension of
 :class:`pandas.DataFrame` to fill incomplete performance maps.
 """
 
+import os
+import bz2
+import gzip
+import lzma
 import warnings
 from copy import deepcopy
 from collections.abc import MutableMapping
@@ -12,6 +16,31 @@ import pandas as pd
 
 from .defaults import build_default_corrections
 
+# How each output quantity is deduced from the two others
+_DEDUCTIONS = {
+    'power': ('capacity', 'COP', np.divide),
+    'capacity': ('power', 'COP', np.multiply),
+    'COP': ('capacity', 'power', np.divide),
+}
+
+# Whether the index levels are written in reversed order, for each majororder
+_FLIP_LEVELS = {'row': False, 'col': True}
+
+# Functions opening a compressed file, for each compression method
+_COMPRESSED_OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+
+# Fixed first lines of the data files read by the TRNSYS Type 3254
+_TYPE3254_PREAMBLE = (
+    "!# This is a data file for Type 3254. Do not change the format.",
+    "!# In PARTICULAR, LINES STARTING WITH !# MUST BE LEFT "
+    "IN THE FILE AT THEIR LOCATION.",
+    '!# Comments within "normal lines" (not starting with !#) '
+    "are optional but the data must be there.",
+    "!#",
+    "!# Independent variables",
+    "!#",
+)
+
 
 @pd.api.extensions.register_dataframe_accessor('pm')
 class Permap:
@@ -46,7 +75,7 @@ class Permap:
         of the first level are the input quantities and those of the
         second level are the output quantities.  Dictionary values
         (the corrections) must be provided as functions with one
-        argument. See examples for more details.
+        argument, supporting NumPy arrays. See examples for more details.
     initial_norm_values : :class:`dict`, default :obj:`None`
         Manufacturer tables are not always provided in rated conditions;
         for example, some performance tables are provided at maximum
@@ -126,7 +155,13 @@ class Permap:
         )
         self._restricted_levels = {key: None for key in self.ranges}
 
-    def update_data(self, df, update_ranges=True, keep_restrictions=False):
+    def update_data(
+        self,
+        df,
+        update_ranges=True,
+        keep_restrictions=False,
+        copy=True
+    ):
         """Return a new performance map with updated data.
 
         Parameters
@@ -138,6 +173,8 @@ class Permap:
         keep_restrictions : bool, default False
             If ``True``, any level already restricted will keep the same
             restriction ('left', 'right' or 'both').
+        copy : bool, default True
+            If ``False``, the data in `df` is not copied.
 
         Returns
         -------
@@ -146,7 +183,7 @@ class Permap:
             adjusted accordingly from the index of `df`.
 
         """
-        pm = df.pm.copyattr(self)
+        pm = df.pm.copyattr(self, deep=copy)
         if update_ranges:
             pm.pm._ranges = ADict(
                 self.index_ranges(df.index),
@@ -264,18 +301,25 @@ class Permap:
     def restricted_levels(self):
         return self._restricted_levels
 
-    def copy(self):
-        return self.copyattr(self)
+    def copy(self, deep=True):
+        return self.copyattr(self, deep=deep)
 
-    def copyattr(self, other):
+    def copyattr(self, other, deep=True):
         """Return a copy of the Permap with some selected attributes
         copied from `other`.
+
+        If `deep` is ``False``, the new DataFrame shares its data with the
+        original one; only the attributes are copied.
         """
-        new = self.data.copy(deep=True)
+        new = self.data.copy(deep=deep)
         if isinstance(other, Permap) or hasattr(other, 'pm'):
             pm = other.pm if hasattr(other, 'pm') else other
+            # Attributes referring to the original Permap (like the ranges)
+            # must refer to the new one, instead of a deep copy of its data
+            memo = {id(pm): new.pm}
             for attribute in self._attributes_to_copy:
-                setattr(new.pm, attribute, deepcopy(getattr(pm, attribute)))
+                value = deepcopy(getattr(pm, attribute), memo)
+                setattr(new.pm, attribute, value)
         else:
             first = type(other).__name__[0].lower()
             aan = 'a' if first in ('a', 'e', 'i', 'o', 'u') else 'an'
@@ -383,23 +427,35 @@ class Permap:
         pm = self.copy()
         if values is None:
             return pm
-        pmcols, vacols = set(pm.pm.data.columns), set(values.columns)
+        rated_values = self._rated_values(pm.columns, values)
+        if len(rated_values) > len(pm.columns):
+            pm = pm.pm._add_missing_column()
+        pm /= rated_values.reindex(pm.columns)
+        pm.pm._normalized = True
+        return pm
+
+    @classmethod
+    def _rated_values(cls, columns, values):
+        """Return the rated values as a Series, after checking that they
+        match the performance map `columns`.
+
+        If `values` lacks an output quantity of the performance map, the
+        missing rated value is deduced from the two other ones.
+        """
+        pmcols, vacols = set(columns), set(values.columns)
         mismatch = pmcols ^ vacols
-        if mismatch < {'capacity', 'power', 'COP'}:
-            if len(pmcols) > len(vacols):
-                values = pm.pm._add_missing_df_column(values)
-            elif len(pmcols) < len(vacols):
-                pm.pm.data = pm.pm._add_missing_df_column(pm.pm.data)
-            for quantity, value in values.iteritems():
-                pm[quantity] /= value[0]
-            pm.pm._normalized = True
-            return pm
-        else:
-            raise ValueError(
-                "DataFrame column index must match values column index."
-                f"\nIndex are {list(pmcols)}"
-                f" and {list(vacols)}"
-            )
+        err_msg = (
+            "DataFrame column index must match values column index."
+            f"\nIndex are {list(pmcols)}"
+            f" and {list(vacols)}"
+        )
+        if not mismatch < {'capacity', 'power', 'COP'}:
+            raise ValueError(err_msg)
+        if len(vacols) == 2 and pmcols - vacols:
+            values = cls._add_missing_df_column(values)
+        if not pmcols <= set(values.columns):
+            raise ValueError(err_msg)
+        return values.iloc[0]
 
     @property
     def corrections(self):
@@ -506,9 +562,7 @@ class Permap:
         self._check_mode(before="setting new correction")
         new = None if inplace else self.copy()
         pm = self if inplace else new.pm
-        updated_corrections = pm.corrections
-        updated_corrections[input_quantity][output_quantity] = new_correction
-        pm.corrections = updated_corrections
+        pm.corrections[input_quantity][output_quantity] = new_correction
         return new
 
     def set_corrections(self, input_quantity, new_corrections):
@@ -570,26 +624,32 @@ class Permap:
             error_message = f"attribute 'mode' must be set before {before}."
             raise RuntimeError(error_message)
 
-    def _check_columns(self, keys):
-        """Check coherence between column index and a set of keys."""
-        columns, keys = set(self.data.columns), set(keys)
-        if columns != keys:
-            unmatched_cols = tuple(columns - keys)
-            unmatched_keys = tuple(keys - columns)
-            error_msg = ["DataFrame column index must match corrections keys."]
-            if unmatched_cols != tuple():
-                multiple = len(unmatched_cols) > 1
-                faulty_cols = unmatched_cols[0] if multiple else unmatched_cols
-                error_msg.append(
-                    f"DataFrame columns not in correction keys: {faulty_cols}"
-                )
-            if unmatched_keys != tuple():
-                multiple = len(unmatched_cols) > 1
-                faulty_keys = unmatched_keys[0] if multiple else unmatched_keys
-                error_msg.append(
-                    f"Correction keys not in DataFrame columns: {faulty_keys}"
-                )
-            raise ValueError('\n'.join(error_msg))
+    def _check_columns(self, keys, columns=None):
+        """Check coherence between column index and a set of keys.
+
+        By default, `keys` are checked against the DataFrame columns.
+        """
+        if columns is None:
+            columns = self.data.columns
+        columns, keys = frozenset(columns), frozenset(keys)
+        if columns == keys:
+            return
+        unmatched_cols = tuple(columns - keys)
+        unmatched_keys = tuple(keys - columns)
+        error_msg = ["DataFrame column index must match corrections keys."]
+        if unmatched_cols != tuple():
+            multiple = len(unmatched_cols) > 1
+            faulty_cols = unmatched_cols[0] if multiple else unmatched_cols
+            error_msg.append(
+                f"DataFrame columns not in correction keys: {faulty_cols}"
+            )
+        if unmatched_keys != tuple():
+            multiple = len(unmatched_cols) > 1
+            faulty_keys = unmatched_keys[0] if multiple else unmatched_keys
+            error_msg.append(
+                f"Correction keys not in DataFrame columns: {faulty_keys}"
+            )
+        raise ValueError('\n'.join(error_msg))
 
     def _check_corrections(self, quantity):
         """Check that the number of corrections makes sense."""
@@ -640,20 +700,9 @@ class Permap:
         corrections = self.corrections[quantity]
         all_keys, keys = {'power', 'capacity', 'COP'}, set(corrections.keys())
         if all_keys == keys:
-            return self.copy()
+            return None if inplace else self.copy()
         missing_key = (all_keys - keys).pop()
-        if missing_key == 'power':
-            cap, COP = (corrections[qt] for qt in ('capacity', 'COP'))
-            def new_correction(x): return cap(x) / COP(x)
-        elif missing_key == 'capacity':
-            power, COP = (corrections[qt] for qt in ('power', 'COP'))
-            def new_correction(x): return power(x) * COP(x)
-        elif missing_key == 'COP':
-            power, cap = (corrections[qt] for qt in ('power', 'capacity'))
-            def new_correction(x): return cap(x) / power(x)
-        else:
-            err_msg = "correction key should be 'capacity', 'power' or 'COP'."
-            raise ValueError(err_msg)
+        new_correction = _deduce_correction(missing_key, corrections)
         if inplace:
             self.set_correction(
                 quantity, missing_key, new_correction, inplace=True)
@@ -663,13 +712,10 @@ class Permap:
     def _add_corrections(self, inplace=False):
         """See :meth:`_add_correction`."""
         new = None if inplace else self.copy()
-        for quantity in set(self.corrections) - {'SHR'}:
-            if inplace:
-                self._add_correction(quantity, inplace=True)
-            else:
-                new.pm = new.pm._add_correction(quantity)
-        if not inplace:
-            return new
+        pm = self if inplace else new.pm
+        for quantity in set(pm.corrections) - {'SHR'}:
+            pm._add_correction(quantity, inplace=True)
+        return new
 
     @classmethod
     def _add_missing_df_column(cls, df):
@@ -691,23 +737,44 @@ class Permap:
         if columns == all_columns:
             return _df
         missing_column = (all_columns - columns).pop()
-        if missing_column == 'power':
-            missing_values = _df.capacity / _df.COP
-        elif missing_column == 'capacity':
-            missing_values = _df.power * _df.COP
-        elif missing_column == 'COP':
-            missing_values = _df.capacity / _df.power
-        else:
-            err_msg = "column names should be 'capacity', 'power' or 'COP'."
-            raise ValueError(err_msg)
-        _df[missing_column] = missing_values
+        first, second, operation = _DEDUCTIONS[missing_column]
+        _df[missing_column] = operation(
+            _df[first].to_numpy(), _df[second].to_numpy()
+        )
         return _df
 
+    @classmethod
+    def _sort_levels(cls, index, level_order):
+        """Reorder the levels of `index` according to `level_order`, and
+        sort it along those levels.
+
+        The result is the same as with ``reorder_levels`` followed by
+        ``sort_index``, but the permutation is also returned so that the
+        data can be reordered in the same gather as any other selection.
+
+        Returns
+        -------
+        sorter : :class:`~numpy.ndarray`
+            Positions of the rows of `index` in sorted order.
+        index : :class:`~pandas.MultiIndex`
+
+        """
+        level_values = [
+            index.get_level_values(level).to_numpy() for level in level_order
+        ]
+        order = np.lexsort(level_values[::-1])
+        sorted_index = pd.MultiIndex.from_arrays(
+            [level[order] for level in level_values],
+            names=level_order
+        )
+        return order, sorted_index
+
     def _add_missing_column(self):
         """See classmethod :meth:`_add_missing_df_column`."""
         return self.update_data(
             self._add_missing_df_column(self.data),
-            keep_restrictions=True
+            keep_restrictions=True,
+            copy=False
         )
 
     def correct(self, corrections, entry, initial=1):
@@ -744,10 +811,8 @@ class Permap:
 
         """
         self._check_columns(corrections.keys())
-        new = self.copy()
-        for quantity, correction in corrections.items():
-            new[quantity] *= correction(entry) / correction(initial)
-        return new
+        scales = self._scales(corrections, [entry], initial, self.data.columns)
+        return self._rescale(scales[0])
 
     def extend(self, corrections, entries, name='new dim'):
         """Extend the performance map along a new dimension.
@@ -780,14 +845,96 @@ class Permap:
         fill : fill missing values in performance map.
 
         """
-        self._check_columns(corrections.keys())
+        columns = self.data.columns
+        values, index = self._extend_values(
+            self.data.to_numpy(),
+            self.data.index,
+            columns,
+            corrections,
+            entries,
+            name
+        )
+        new = pd.DataFrame(values, index=index, columns=columns)
+        return self.update_data(new, keep_restrictions=True, copy=False)
+
+    def _extend_values(
+        self,
+        values,
+        index,
+        columns,
+        corrections,
+        entries,
+        name
+    ):
+        """Carry out :meth:`extend` on a performance map given by its
+        `values`, `index` and `columns`.
+
+        The whole table is scaled once per entry in a single broadcast.
+
+        Returns
+        -------
+        values : :class:`~numpy.ndarray`
+        index : :class:`~pandas.MultiIndex`
+
+        """
+        self._check_columns(corrections.keys(), columns)
         initial = self.initial_norm_values[name]
-        new = pd.concat(
-            [self.correct(corrections, entry, initial) for entry in entries],
-            keys=entries,
-            names=[name]
+        scales = self._scales(corrections, entries, initial, columns)
+        extended_values = values * scales[:, np.newaxis, :]
+        return (
+            extended_values.reshape(-1, values.shape[1]),
+            self._product_index(entries, index, name)
         )
-        return self.update_data(new, keep_restrictions=True)
+
+    @classmethod
+    def _product_index(cls, entries, index, name):
+        """Return the cartesian product of `entries` (outer level, named
+        `name`) and `index` as a MultiIndex.
+
+        The product is built directly from the levels and codes of
+        `index`, without hashing the level values again.
+        """
+        if not isinstance(index, pd.MultiIndex):
+            index = pd.MultiIndex.from_arrays([index])
+        entries_codes, entries_level = pd.factorize(
+            np.asarray(entries), sort=True
+        )
+        return pd.MultiIndex(
+            levels=[entries_level, *index.levels],
+            codes=[
+                np.repeat(entries_codes, len(index)),
+                *(np.tile(codes, len(entries_codes)) for codes in index.codes)
+            ],
+            names=[name, *index.names],
+            verify_integrity=False
+        )
+
+    @classmethod
+    def _scales(cls, corrections, entries, initial, columns):
+        """Return the correction factors for each entry (rows) and each
+        output quantity (in the same order as `columns`).
+
+        Each correction is evaluated once on the array of all entries,
+        and once at the initial value.
+        """
+        entries = np.asarray(entries, dtype=float)
+        return np.column_stack([
+            np.broadcast_to(
+                corrections[qty](entries) / corrections[qty](initial),
+                entries.shape
+            )
+            for qty in columns
+        ]).astype(float, copy=False)
+
+    def _rescale(self, scales):
+        """Return a copy of the Permap with each column multiplied by
+        the corresponding scale factor."""
+        new = pd.DataFrame(
+            self.data.to_numpy() * scales,
+            index=self.data.index,
+            columns=self.data.columns
+        )
+        return new.pm.copyattr(self, deep=False)
 
     def fill(self, norm=None):
         """Extend the performance to include frequency, air flow rate and
@@ -871,55 +1018,96 @@ class Permap:
         if norm is not None and self.normalized:
             raise RuntimeError("values are already normalized")
 
-        freq_corr = self.get_correction('freq')
-        with_freq = self._add_missing_column().pm.extend(
-            freq_corr, self.entries['freq'], name='freq'
-        )
-        AFR_corr = self.get_correction('AFR')
-        with_AFR = with_freq.pm.extend(
-            AFR_corr, self.entries['AFR'], name='AFR'
+        values, index, columns = self._fill_values(norm)
+        permap = self.update_data(
+            pd.DataFrame(values, index=index, columns=columns),
+            keep_restrictions=True,
+            copy=False
         )
-        if self.mode == 'heating':
-            new_level_order = ['Tdbr', 'Tdbo', 'AFR', 'freq']
-            pm_norm = (
-                with_AFR.reorder_levels(new_level_order).sort_index()
-                .pm.copyattr(with_AFR).pm.normalize(norm)
+        permap.pm._normalized = self.normalized or norm is not None
+        return permap
+
+    def _fill_values(self, norm=None):
+        """Carry out :meth:`fill` on the underlying arrays, wrapping
+        them in a DataFrame only once at the end.
+
+        Returns
+        -------
+        values : :class:`~numpy.ndarray`
+        index : :class:`~pandas.MultiIndex`
+        columns : :class:`~pandas.Index`
+
+        """
+        mode, corrections, entries = self.mode, self.corrections, self.entries
+        data = self._add_missing_df_column(self.data)
+        values, index, columns = data.to_numpy(), data.index, data.columns
+        for quantity in ('freq', 'AFR'):
+            values, index = self._extend_values(
+                values,
+                index,
+                columns,
+                corrections[quantity],
+                entries[quantity],
+                name=quantity
             )
-            permap = pm_norm.reindex(['power', 'capacity'], axis='columns')
-        elif self.mode == 'cooling':
-            without_Twbr = with_AFR.droplevel('Twbr').pm.copyattr(with_AFR)
-            Twbr = with_AFR.index.get_level_values('Twbr').unique().to_numpy()
-            Twbr_corr = self.get_correction('Twbr')
-            with_Twbr = without_Twbr.pm.extend(Twbr_corr, Twbr, name='Twbr')
-            pm_norm = with_Twbr.pm.normalize(norm)
-            Tdb = pm_norm.index.get_level_values('Tdbr').to_numpy()
-            Twb = pm_norm.index.get_level_values('Twbr').to_numpy()
-            invalid_states = Tdb < Twb
-            valid_states = np.logical_not(invalid_states)
-            wb_depression = Tdb[valid_states] - Twb[valid_states]
-            SHR = self.get_correction('SHR')
-            pm_norm.loc[valid_states, 'sensible_capacity'] = (
-                pm_norm.capacity.iloc[valid_states] * SHR(wb_depression)
+        if mode == 'cooling':
+            # Manufacturer data only give one Twbr per Tdbr: drop the level
+            # and extend again to get every (Tdbr, Twbr) combination.  The
+            # Twbr entries are read from the level codes, without hashing
+            # the level values of every row.
+            iwb = index.names.index('Twbr')
+            Twbr = index.levels[iwb][np.unique(index.codes[iwb])].to_numpy()
+            values, index = self._extend_values(
+                values,
+                index.droplevel(iwb),
+                columns,
+                corrections['Twbr'],
+                Twbr,
+                name='Twbr'
             )
-            pm_norm.loc[valid_states, 'latent_capacity'] = (
-                pm_norm.capacity.iloc[valid_states]
-                - pm_norm.sensible_capacity.iloc[valid_states]
+        if norm is not None:
+            rated_values = self._rated_values(columns, norm)
+            values = values / rated_values.reindex(columns).to_numpy()
+
+        if mode == 'heating':
+            new_level_order = ['Tdbr', 'Tdbo', 'AFR', 'freq']
+            new_index_order = ['power', 'capacity']
+            positions = [columns.get_loc(qty) for qty in new_index_order]
+        elif mode == 'cooling':
+            # The wet-bulb depression only depends on the (Tdbr, Twbr) pair:
+            # compute derived quantities once per pair from the index levels
+            # and map them back to the rows through the index codes.
+            idb, iwb = (index.names.index(lvl) for lvl in ('Tdbr', 'Twbr'))
+            pairs = index.codes[idb], index.codes[iwb]
+            wb_depressions = np.subtract.outer(
+                index.levels[idb].to_numpy(), index.levels[iwb].to_numpy()
             )
+            invalid_states = (wb_depressions < 0)[pairs]
+            shr = np.broadcast_to(
+                corrections['SHR'](wb_depressions), wb_depressions.shape
+            )[pairs]
+            # Split capacity into sensible and latent parts in one pass
+            power = values[:, columns.get_loc('power')]
+            capacity = values[:, columns.get_loc('capacity')]
+            sensible_capacity = capacity * shr
+            values = np.column_stack([
+                power,
+                sensible_capacity,
+                capacity - sensible_capacity
+            ])
             # Put -999 flag at invalid states
-            pm_norm.iloc[invalid_states, :] = -999
+            values[invalid_states] = -999
             new_level_order = ['Tdbr', 'Twbr', 'Tdbo', 'AFR', 'freq']
             new_index_order = ['power', 'sensible_capacity', 'latent_capacity']
-            permap = (
-                pm_norm.drop('capacity', axis='columns')
-                .reorder_levels(new_level_order)
-                .sort_index()
-                .reindex(new_index_order, axis='columns')
-            )
+            positions = list(range(len(new_index_order)))
         else:
             raise ValueError("mode must either be heating or cooling")
-        return permap.pm.copyattr(pm_norm)
+        # Sort rows and select columns with a single gather
+        sorter, index = self._sort_levels(index, new_level_order)
+        values = values[np.ix_(sorter, positions)]
+        return values, index, pd.Index(new_index_order, name=columns.name)
 
-    def write(self, filename, majororder='row'):
+    def write(self, filename, majororder='row', compression=None):
         """Write performance map to a file using a format compatible with
         the TRNSYS `Type 3254 <https://github.com/polymtl-bee/vcaahp-model>`_.
 
@@ -931,53 +1119,99 @@ class Permap:
             Choose to write the performance map either in
             `row- or column-major order
             <https://en.wikipedia.org/wiki/Row-_and_column-major_order>`_.
+            Case insensitive.
+        compression : {None, 'gzip', 'bz2', 'xz'}, default None
+            Compress the file on the fly with the given method.
+            The Type 3254 only reads uncompressed files, so this is
+            meant for storing or sharing performance maps.
+
+        Raises
+        ------
+        TypeError
+            If `majororder` is not a string.
+        ValueError
+            If `majororder` is neither ``'row'`` nor ``'col'``,
+            or if `compression` is not a supported method.
 
         """
-        if not isinstance(majororder, str):
-            raise TypeError("order must be either 'row' or 'col'.")
-        else:
-            order = majororder.lower()
-        if order not in ('row', 'col'):
-            raise TypeError("order must be either 'row' or 'col'.")
-
-        permap_formatted = pd.concat([self.data], keys=[''], names=['!#'])
-        if order == 'col':
-            levels = permap_formatted.index.names
-            flip_levels = [levels[0]] + levels[-1:0:-1]
-            permap_formatted = permap_formatted.reorder_levels(flip_levels)
-        permap_formatted.sort_index().round(10).to_csv(filename, sep='\t')
-
-        def prepend_line(line):
-            with open(filename, 'r+') as f:
-                content = f.read()
-                f.seek(0, 0)
-                f.write(line.rstrip('\r\n') + '\n' + content)
-
-        def fetch_index(i):
-            index = self.data.index.get_level_values(i).unique()
-            return index.name, index.values
-
-        prepend_line("!#\n!# Performance map\n!#")
-        nlevels = self.data.index.nlevels
-        for name, values in (fetch_index(i) for i in range(nlevels-1, -1, -1)):
-            values_str = '\t'.join(str(v) for v in values)
-            prepend_line(f"!# {name} values\n   {values_str}\n")
-        for name, values in (fetch_index(i) for i in range(nlevels-1, -1, -1)):
-            rng = self.ranges[name]
-            prepend_line(f"   {len(values)}\t{rng.left}\t{rng.right}\n")
-            s = f"!# Number of {name} data points, lower bound, upper bound\n"
-            prepend_line(s)
-
-        warning = (
-            "!# This is a data file for Type 3254. Do not change the format.\n"
-            "!# In PARTICULAR, LINES STARTING WITH !# MUST BE LEFT "
-            "IN THE FILE AT THEIR LOCATION.\n"
-            '!# Comments within "normal lines" (not starting with !#) '
-            "are optional but the data must be there.\n"
-            "!#\n!# Independent variables\n!#"
+        if compression is not None and compression not in _COMPRESSED_OPENERS:
+            raise ValueError(
+                "'compression' must be one of "
+                f"{', '.join(_COMPRESSED_OPENERS)} or None."
+            )
+        try:
+            flip = _FLIP_LEVELS[majororder.lower()]
+        except AttributeError:
+            raise TypeError("'majororder' must be a string.")
+        except KeyError:
+            raise ValueError("'majororder' must be either 'row' or 'col'.")
+
+        data, ranges = self.data, self.ranges
+        index = data.index
+        if not isinstance(index, pd.MultiIndex):
+            index = pd.MultiIndex.from_arrays([index])
+        index = index.remove_unused_levels()
+        names, levels = index.names, index.levels
+        # Tuple level names are written as words instead of their repr
+        labels = [
+            ' '.join(map(str, name)) if isinstance(name, tuple) else str(name)
+            for name in names
+        ]
+
+        # Sort the rows in the requested order and round them. An empty
+        # first level named '!#' is added to comment the body header line.
+        sorter, sorted_index = self._sort_levels(
+            index.set_names(labels), labels[::-1] if flip else labels
         )
-
-        prepend_line(warning)
+        formatted_index = self._product_index([''], sorted_index, '!#')
+        dtypes = set(data.dtypes)
+        if len(dtypes) == 1 and dtypes.pop().kind == 'f':
+            # Single float dtype: gather the values in one new array and
+            # round it in place
+            values = data.to_numpy()[sorter]
+            np.round(values, 10, out=values)
+            permap_formatted = pd.DataFrame(
+                values,
+                index=formatted_index,
+                columns=data.columns,
+                copy=False
+            )
+        else:
+            # Mixed dtypes: round column-wise so each column keeps its dtype
+            permap_formatted = data.iloc[sorter].round(10)
+            permap_formatted.index = formatted_index
+
+        level_ranges = [ranges[name] for name in names]
+        counts = [
+            f"!# Number of {label} data points, lower bound, upper bound"
+            f"{os.linesep}   {len(level)}\t{rng.left}\t{rng.right}"
+            for label, level, rng in zip(labels, levels, level_ranges)
+        ]
+        entries = [
+            f"!# {label} values{os.linesep}   "
+            + '\t'.join(level.to_numpy().astype(str))
+            for label, level in zip(labels, levels)
+        ]
+        header = os.linesep.join([
+            *_TYPE3254_PREAMBLE,
+            *counts,
+            *entries,
+            "!#",
+            "!# Performance map",
+            "!#",
+            "",
+        ])
+
+        # to_csv ends lines with os.linesep: use it for the header as well,
+        # and stream the body through the same buffered file object
+        # without newline translation.
+        if compression is None:
+            f = open(filename, 'w', buffering=2**20, newline='')
+        else:
+            f = _COMPRESSED_OPENERS[compression](filename, 'wt', newline='')
+        with f:
+            f.write(header)
+            permap_formatted.to_csv(f, sep='\t')
 
 
 class ADict(MutableMapping):
@@ -1011,6 +1245,19 @@ class ADict(MutableMapping):
         return self.store.__repr__()
 
 
+def _deduce_correction(missing_key, corrections):
+    """Return the correction of an output quantity deduced from the
+    corrections of the two other ones, given in the dict `corrections`.
+    """
+    if missing_key not in _DEDUCTIONS:
+        err_msg = "correction key should be 'capacity', 'power' or 'COP'."
+        raise ValueError(err_msg)
+    first, second, operation = _DEDUCTIONS[missing_key]
+    first, second = corrections[first], corrections[second]
+    def new_correction(x): return operation(first(x), second(x))
+    return new_correction
+
+
 def set_range(self, pm, key, value):
     if pm is None:
         raise TypeError("'pm' cannot be None.")
@@ -4,7 +4,7 @@ import pytest
 import numpy as np
 from numpy.testing import assert_almost_equal
 
-from costa.defaults import default_correction
+from costa.defaults import default_correction, build_default_corrections
 
 
 Quantity = namedtuple('Quantity', ['name', 'value'])
@@ -61,3 +61,29 @@ def test_heating_corrections_values(pminput, pmoutput):
 def test_heating_corrections_asymptotic_behavior(mode, pminput, pmoutput):
     corr = default_correction(mode, pminput, pmoutput)
     assert np.isfinite(corr(np.inf))
+
+
+@pytest.mark.parametrize('mode', ['cooling', 'heating'])
+def test_build_default_corrections_shares_functions(mode):
+    first, second = (build_default_corrections(mode) for _ in range(2))
+    assert first is not second
+    assert first['freq'] is not second['freq']
+    assert first['freq']['power'] is second['freq']['power']
+
+
+@pytest.mark.parametrize(
+    "mode, pminput, pmoutput",
+    [
+        ('cooling', 'freq', 'COP'),
+        ('cooling', 'AFR', 'power'),
+        ('cooling', 'Twbr', 'COP'),
+        ('cooling', 'SHR', None),
+        ('heating', 'freq', 'power'),
+        ('heating', 'AFR', 'COP'),
+    ]
+)
+def test_corrections_are_vectorized(mode, pminput, pmoutput):
+    corr = default_correction(mode, pminput, pmoutput)
+    x = np.linspace(0.1, 2, 20)
+    assert corr(x).shape == x.shape
+    assert_almost_equal(corr(x), [corr(value) for value in x])
@@ -1,3 +1,7 @@
+import bz2
+import gzip
+import lzma
+
 import pytest
 import numpy as np
 import pandas as pd
@@ -155,6 +159,22 @@ class TestPermap:
         with pytest.raises(RuntimeError):
             permap_normalized.pm.normalize(rated_values)
 
+    def test_normalize_other_columns(self, mode, permap):
+        permap.pm.mode = mode
+        rated_values = pd.DataFrame({'capacity': [2], 'COP': [4]})
+        permap_normalized = permap.pm.normalize(rated_values)
+        assert not np.isnan(permap_normalized.to_numpy()).any()
+        assert_series_equal(
+            permap_normalized.power, permap.power * 2, check_names=False
+        )
+        assert_series_equal(
+            permap_normalized.capacity, permap.capacity / 2, check_names=False
+        )
+        with pytest.raises(ValueError):
+            permap.pm.normalize(pd.DataFrame({'capacity': [2]}))
+        with pytest.raises(ValueError):
+            permap.pm.normalize(pd.DataFrame({'capacity': [2], 'pwr': [1]}))
+
     def test_copy(self, permap):
         copy = permap.pm.copy()
         assert_frame_equal(permap, copy)
@@ -162,6 +182,10 @@ class TestPermap:
             getattr(permap.pm, attribute) == getattr(copy.pm, attribute)
             for attribute in costa.Permap._attributes_to_copy
         ])
+        assert not np.shares_memory(permap.to_numpy(), copy.to_numpy())
+        assert copy.pm.ranges._pm is copy.pm
+        shallow = permap.pm.copy(deep=False)
+        assert np.shares_memory(permap.to_numpy(), shallow.to_numpy())
 
     def test_entries(self, permap):
         assert isinstance(permap.pm.entries, dict)
@@ -227,6 +251,25 @@ class TestPermap:
         permap.pm._add_correction('freq', inplace=True)
         assert len(permap.pm.corrections['freq'].keys()) == 3
 
+    def test_add_corrections(self, mode, permap):
+        permap.pm.corrections = build_default_corrections(mode)
+        with pytest.warns(UserWarning):
+            permap.pm.mode = mode
+        new = permap.pm._add_corrections()
+        assert len(permap.pm.corrections['freq'].keys()) == 2
+        assert len(new.pm.corrections['freq'].keys()) == 3
+        assert permap.pm._add_corrections(inplace=True) is None
+        assert len(permap.pm.corrections['AFR'].keys()) == 3
+
+    def test_add_correction_unhashable(self, mode, permap):
+        permap.pm.mode = mode
+        corrections = {
+            'power': np.poly1d([1., 0.]), 'COP': np.poly1d([.5, 1.])
+        }
+        permap = permap.pm.set_corrections('freq', corrections)
+        capacity = permap.pm.corrections['freq']['capacity']
+        assert capacity(2.) == pytest.approx(2. * 2.)
+
     def test_add_missing_df_column(self, permap):
         assert len(permap.columns) == 2
         extended = costa.Permap._add_missing_df_column(permap)
@@ -273,3 +316,107 @@ class TestPermap:
             rated_values = pd.DataFrame({'capacity': [4.69], 'power': [1.01]})
         filled_map = permap.pm.fill(norm=rated_values)
         assert_frame_equal(filled_map, filled_table)
+
+    def test_fill_constant_shr(self, mode, permap):
+        if mode == 'heating':
+            pytest.skip("SHR only available in cooling mode.")
+        permap.pm.entries['freq'] = [0.5, 1]
+        permap.pm.mode = mode
+        permap.pm.corrections['SHR'] = lambda x: 0.75
+        filled = permap.pm.fill()
+        valid = filled.sensible_capacity != -999
+        assert_series_equal(
+            filled.sensible_capacity[valid],
+            0.75 * (filled.sensible_capacity + filled.latent_capacity)[valid],
+            check_names=False
+        )
+
+    @pytest.mark.parametrize('single_level', [False, True])
+    @pytest.mark.parametrize('majororder', ['row', 'col'])
+    def test_write(self, filled_table, tmp_path, majororder, single_level):
+        if single_level:
+            # Keep only the rows of the first values of the outer levels
+            filled_table = filled_table.loc[filled_table.index[0][:-1]]
+        filename = tmp_path / "permap.dat"
+        filled_table.pm.write(filename, majororder=majororder)
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        index = filled_table.index
+        names = index.names
+        # Check header
+        assert lines[0].startswith("!# This is a data file for Type 3254")
+        for name in names:
+            values = index.unique(level=name)
+            rng = filled_table.pm.ranges[name]
+            counts_line = lines.index(
+                f"!# Number of {name} data points, lower bound, upper bound"
+            ) + 1
+            expected = f"   {len(values)}\t{rng.left}\t{rng.right}"
+            assert lines[counts_line] == expected
+            values_line = lines.index(f"!# {name} values") + 1
+            assert lines[values_line].split() == [str(v) for v in values]
+        # Check body
+        body_start = lines.index("!# Performance map") + 2
+        order = names if majororder == 'row' else names[::-1]
+        assert lines[body_start] == '\t'.join(['!#', *order, *filled_table])
+        written = pd.read_csv(
+            filename,
+            sep='\t',
+            skiprows=body_start,
+            index_col=list(range(1, len(names) + 1))
+        ).drop(columns='!#')
+        written.columns.name = filled_table.columns.name
+        if not single_level:
+            written = written.reorder_levels(names)
+        assert_frame_equal(
+            written.sort_index(),
+            filled_table,
+            check_exact=False,
+            atol=1e-9
+        )
+
+    @pytest.mark.parametrize(
+        'compression, opener',
+        [('gzip', gzip.open), ('bz2', bz2.open), ('xz', lzma.open)]
+    )
+    def test_write_compression(self, permap, tmp_path, compression, opener):
+        filename = tmp_path / "permap.dat"
+        permap.pm.write(filename)
+        compressed = tmp_path / f"permap.dat.{compression}"
+        permap.pm.write(compressed, compression=compression)
+        with opener(compressed) as f:
+            assert f.read() == filename.read_bytes()
+
+    def test_write_int_column(self, permap, tmp_path):
+        filename = tmp_path / "permap.dat"
+        permap['power'] = (100 * permap.power).round().astype(int)
+        permap.pm.write(filename)
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        body_start = lines.index("!# Performance map") + 3
+        powers = [line.split('\t')[-1] for line in lines[body_start:]]
+        assert sorted(powers) == sorted(map(str, permap.power))
+
+    def test_write_tuple_names(self, permap, tmp_path):
+        filename = tmp_path / "permap.dat"
+        renamed = permap.copy()
+        renamed.index = renamed.index.set_names(
+            [(name, 'in') for name in permap.index.names]
+        )
+        renamed.pm.update_data(renamed).pm.write(filename)
+        with open(filename) as f:
+            text = f.read()
+        assert "('" not in text
+        for name in permap.index.names:
+            assert f"!# {name} in values" in text
+
+    def test_write_majororder(self, permap, tmp_path, no_param):
+        filename = tmp_path / "permap.dat"
+        permap.pm.write(filename, majororder='COL')
+        assert filename.exists()
+        with pytest.raises(ValueError):
+            permap.pm.write(filename, majororder='diagonal')
+        with pytest.raises(TypeError):
+            permap.pm.write(filename, majororder=None)
+        with pytest.raises(ValueError):
+            permap.pm.write(filename, compression='zip')